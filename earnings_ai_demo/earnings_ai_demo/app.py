@@ -1,19 +1,174 @@
 # earnings_ai_demo/earnings_ai_demo/app.py
 import streamlit as st
 import asyncio
+import threading
 from pathlib import Path
-import yaml
 import tempfile
+import shutil
+import hashlib
 import os
+from config import load_config
 from database import DatabaseOperations
 from transcription import AudioTranscriber
 from embedding import EmbeddingGenerator
+import extraction
 from extraction import DocumentExtractor
 from query import QueryInterface
 
-def load_config():
-    with open('config/config.yaml') as f:
-        return yaml.safe_load(f)
+__all__ = ['EarningsAIApp', 'main']
+
+def file_content_hash(file):
+    """Hash an uploaded file's content in streaming chunks."""
+    digest = hashlib.blake2b(digest_size=16)
+    file.seek(0)
+    for chunk in iter(lambda: file.read(1024 * 1024), b''):
+        digest.update(chunk)
+    file.seek(0)
+    return digest.hexdigest()
+
+
+# Static page CSS, built once at import time rather than per rerun
+_CSS = """
+    <style>
+    /* Global Styles */
+    .stApp {
+        background-color: #2c2c2e;
+        color: #f5f5f7;
+    }
+    
+    /* Typography */
+    h1, h2, h3 {
+        font-family: -apple-system, BlinkMacSystemFont, sans-serif;
+        font-weight: 600;
+        color: #ffffff;
+    }
+    
+    /* Input and Text Styles */
+    input, textarea {
+        background-color: #3a3a3c;
+        color: #f5f5f7;
+        border: none;
+        border-radius: 5px;
+    }
+    
+    /* Buttons */
+    .stButton > button {
+        background-color: #007bff;
+        color: white;
+        border: none;
+        border-radius: 0.25rem;
+        padding: 0.5rem 1rem;
+        font-size: 1rem;
+        cursor: pointer;
+    }
+    .stButton > button:hover {
+        background-color: #0056b3;
+    }
+    
+    /* Chat Messages */
+    .chat-message {
+        padding: 1rem;
+        margin-bottom: 0.5rem;
+    }
+    
+    .user-message {
+        background: #1a1a1c;
+        margin-left: 20%;
+        margin-right: 10px;
+        border-radius: 15px 15px 0 15px;
+    }
+    
+    .bot-message {
+        background: #2d2d30;
+        margin-right: 20%;
+        margin-left: 10px;
+        border-radius: 15px 15px 15px 0;
+    }
+    
+    /* Remove unwanted spacing and dividers */
+    [data-testid="stMarkdownContainer"] {
+        margin: 0 !important;
+        padding: 0 !important;
+        border: none !important;
+    }
+    
+    .st-emotion-cache-1cvow4s {
+        margin: 0 !important;
+        padding: 0 !important;
+        border: none !important;
+    }
+
+    /* Error and Success Messages */
+    .st-alert-error {
+        background-color: #000000;
+        color: #ffffff;
+        border-radius: 8px;
+        padding: 1rem;
+        margin-bottom: 0.5rem;
+    }
+
+    .st-alert-success {
+        background-color: #000000;
+        color: #ffffff;
+        border-radius: 8px;
+        padding: 1rem;
+        margin-bottom: 0.5rem;
+    }
+
+    /* Form styling */
+    .stForm {
+        background-color: transparent !important;
+        border: none !important;
+    }
+    
+    .stForm [data-testid="stForm"] {
+        border: none !important;
+        padding: 0 !important;
+    }
+
+    /* Chat container */
+    .chat-container {
+        display: flex;
+        flex-direction: column;
+        gap: 0.5rem;
+    }
+
+    /* Sources expander */
+    .streamlit-expanderHeader {
+        background-color: #3a3a3c !important;
+        border-radius: 5px;
+    }
+
+    /* Secondary button style */
+    .secondary-button {
+        background-color: #6c757d !important;
+    }
+    .secondary-button:hover {
+        background-color: #5a6268 !important;
+    }
+    
+    /* File uploader styling */
+    .uploadedFiles {
+        margin-top: 1rem;
+        background: transparent !important;
+    }
+    
+    /* Processed files section */
+    .processed-files {
+        margin-top: 1rem;
+        padding: 0;
+        background: transparent;
+    }
+    
+    /* Remove stMarkdown borders */
+    .element-container {
+        margin: 0 !important;
+        padding: 0 !important;
+        border: none !important;
+    }
+    </style>
+"""
+
 
 class EarningsAIApp:
     def __init__(self):
@@ -26,42 +181,128 @@ class EarningsAIApp:
             api_key=config['fireworks']['api_key'],
             database_operations=self.db
         )
+        self.max_concurrency = config.get('processing', {}).get('max_concurrency', 8)
 
-    async def process_files(self, files):
-        results = []
-        for file in files:
+    async def _extract_one(self, file, semaphore):
+        async with semaphore:
             file_type = "audio" if file.type and file.type.startswith("audio") else "document"
             file_extension = Path(file.name).suffix
-            
-            with tempfile.NamedTemporaryFile(suffix=file_extension, delete=True) as tmp_file:
-                tmp_file.write(file.getvalue())
-                tmp_file.flush()
-
-                try:
-                    if file_type == "audio":
-                        result = await self.transcriber.transcribe_file(
-                            tmp_file.name,
-                            metadata={'company_ticker': 'MDB', 'filename': file.name}
-                        )
-                        text = result['transcription']
-                        metadata = result['metadata']
-                    else:
-                        result = self.doc_extractor.extract_text(tmp_file.name)
-                        text = result['text']
-                        metadata = {**result['metadata'], 'filename': file.name}
-
-                    embedding = self.embedding_gen.generate_document_embedding(text)
-                    self.db.store_document(text=text, embeddings=embedding, metadata=metadata)
-                    results.append({"filename": file.name, "status": "success"})
-                except Exception as e:
-                    results.append({"filename": file.name, "status": "error", "message": str(e)})
+
+            tmp_file = tempfile.NamedTemporaryFile(suffix=file_extension, delete=False)
+            try:
+                def copy_to_tmp():
+                    # Stream in 1 MiB chunks instead of materializing the whole upload in RAM
+                    file.seek(0)
+                    shutil.copyfileobj(file, tmp_file, 1024 * 1024)
+
+                await asyncio.to_thread(copy_to_tmp)
+                tmp_file.close()
+
+                if file_type == "audio":
+                    result = await self.transcriber.transcribe_file(
+                        tmp_file.name,
+                        metadata={'company_ticker': 'MDB', 'filename': file.name}
+                    )
+                    text = result['transcription']
+                    metadata = result['metadata']
+                else:
+                    result = await asyncio.get_running_loop().run_in_executor(
+                        extraction.get_process_pool(), extraction.extract_text, tmp_file.name
+                    )
+                    text = result['text']
+                    metadata = {**result['metadata'], 'filename': file.name}
+
+                metadata['document_type'] = 'audio_transcript' if file_type == "audio" else 'document'
+                metadata['content_hash'] = await asyncio.to_thread(file_content_hash, file)
+                return {"filename": file.name, "text": text, "metadata": metadata}
+            finally:
+                tmp_file.close()
+                os.unlink(tmp_file.name)
+
+    async def process_files(self, files):
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        tasks = [self._extract_one(file, semaphore) for file in files]
+        outcomes = await asyncio.gather(*tasks, return_exceptions=True)
+
+        results = []
+        extracted = []
+        for file, outcome in zip(files, outcomes):
+            if isinstance(outcome, Exception):
+                results.append({"filename": file.name, "status": "error", "message": str(outcome)})
+            else:
+                extracted.append(outcome)
+
+        if not extracted:
+            return results
+
+        chunk_lists = [self.embedding_gen.chunk_text(item['text']) for item in extracted]
+        try:
+            chunk_embeddings = await self.embedding_gen.agenerate_embeddings_batch(
+                [chunk for chunks in chunk_lists for chunk in chunks]
+            )
+        except Exception as e:
+            results.extend({"filename": item['filename'], "status": "error", "message": str(e)} for item in extracted)
+            return results
+
+        docs = []
+        offset = 0
+        for item, chunks in zip(extracted, chunk_lists):
+            parent_id = item['metadata'].get('content_hash', item['filename'])
+            for idx, (chunk, embedding) in enumerate(zip(chunks, chunk_embeddings[offset:offset + len(chunks)])):
+                docs.append({
+                    "text": chunk,
+                    "embeddings": embedding,
+                    "metadata": {**item['metadata'], 'parent_id': parent_id, 'chunk_idx': idx}
+                })
+            offset += len(chunks)
+
+        try:
+            statuses = await asyncio.to_thread(self.db.store_documents, docs)
+        except Exception as e:
+            results.extend({"filename": item['filename'], "status": "error", "message": str(e)} for item in extracted)
+            return results
+
+        failures = {}
+        for status in statuses:
+            if status['status'] == 'error':
+                failures.setdefault(status['filename'], status['message'])
+        for item in extracted:
+            if item['filename'] in failures:
+                results.append({"filename": item['filename'], "status": "error", "message": failures[item['filename']]})
+            else:
+                results.append({"filename": item['filename'], "status": "success"})
 
         return results
 
-    async def query_documents(self, query_text):
+    def query_documents_sync(self, query_text):
         result = self.query_interface.query(query_text)
         return result['response'], result['sources']
 
+    async def query_documents(self, query_text):
+        return self.query_documents_sync(query_text)
+
+
+@st.cache_resource
+def get_app():
+    return EarningsAIApp()
+
+
+@st.cache_resource
+def get_loop():
+    """One long-lived event loop on a daemon thread, shared across reruns."""
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    return loop
+
+
+def run_async(coro):
+    return asyncio.run_coroutine_threadsafe(coro, get_loop()).result()
+
+
+@st.cache_data(ttl=86400, max_entries=128, show_spinner=False)
+def run_query(query_text):
+    return get_app().query_documents_sync(query_text)
+
 def main():
     st.set_page_config(
         page_title="EarningsAI",
@@ -70,157 +311,21 @@ def main():
         initial_sidebar_state="collapsed"
     )
 
-    st.markdown("""
-        <style>
-        /* Global Styles */
-        .stApp {
-            background-color: #2c2c2e;
-            color: #f5f5f7;
-        }
-        
-        /* Typography */
-        h1, h2, h3 {
-            font-family: -apple-system, BlinkMacSystemFont, sans-serif;
-            font-weight: 600;
-            color: #ffffff;
-        }
-        
-        /* Input and Text Styles */
-        input, textarea {
-            background-color: #3a3a3c;
-            color: #f5f5f7;
-            border: none;
-            border-radius: 5px;
-        }
-        
-        /* Buttons */
-        .stButton > button {
-            background-color: #007bff;
-            color: white;
-            border: none;
-            border-radius: 0.25rem;
-            padding: 0.5rem 1rem;
-            font-size: 1rem;
-            cursor: pointer;
-        }
-        .stButton > button:hover {
-            background-color: #0056b3;
-        }
-        
-        /* Chat Messages */
-        .chat-message {
-            padding: 1rem;
-            margin-bottom: 0.5rem;
-        }
-        
-        .user-message {
-            background: #1a1a1c;
-            margin-left: 20%;
-            margin-right: 10px;
-            border-radius: 15px 15px 0 15px;
-        }
-        
-        .bot-message {
-            background: #2d2d30;
-            margin-right: 20%;
-            margin-left: 10px;
-            border-radius: 15px 15px 15px 0;
-        }
-        
-        /* Remove unwanted spacing and dividers */
-        [data-testid="stMarkdownContainer"] {
-            margin: 0 !important;
-            padding: 0 !important;
-            border: none !important;
-        }
-        
-        .st-emotion-cache-1cvow4s {
-            margin: 0 !important;
-            padding: 0 !important;
-            border: none !important;
-        }
-
-        /* Error and Success Messages */
-        .st-alert-error {
-            background-color: #000000;
-            color: #ffffff;
-            border-radius: 8px;
-            padding: 1rem;
-            margin-bottom: 0.5rem;
-        }
-
-        .st-alert-success {
-            background-color: #000000;
-            color: #ffffff;
-            border-radius: 8px;
-            padding: 1rem;
-            margin-bottom: 0.5rem;
-        }
-
-        /* Form styling */
-        .stForm {
-            background-color: transparent !important;
-            border: none !important;
-        }
-        
-        .stForm [data-testid="stForm"] {
-            border: none !important;
-            padding: 0 !important;
-        }
-
-        /* Chat container */
-        .chat-container {
-            display: flex;
-            flex-direction: column;
-            gap: 0.5rem;
-        }
-
-        /* Sources expander */
-        .streamlit-expanderHeader {
-            background-color: #3a3a3c !important;
-            border-radius: 5px;
-        }
-
-        /* Secondary button style */
-        .secondary-button {
-            background-color: #6c757d !important;
-        }
-        .secondary-button:hover {
-            background-color: #5a6268 !important;
-        }
-        
-        /* File uploader styling */
-        .uploadedFiles {
-            margin-top: 1rem;
-            background: transparent !important;
-        }
-        
-        /* Processed files section */
-        .processed-files {
-            margin-top: 1rem;
-            padding: 0;
-            background: transparent;
-        }
-        
-        /* Remove stMarkdown borders */
-        .element-container {
-            margin: 0 !important;
-            padding: 0 !important;
-            border: none !important;
-        }
-        </style>
-    """, unsafe_allow_html=True)
+    st.html(_CSS)
 
     if 'processed_files' not in st.session_state:
         st.session_state.processed_files = set()
 
+    if 'processed_hashes' not in st.session_state:
+        st.session_state.processed_hashes = set()
+
     if 'chat_history' not in st.session_state:
         st.session_state.chat_history = []
 
     st.title("EarningsAI")
     st.markdown("Transform your documents into insights")
 
-    app = EarningsAIApp()
+    app = get_app()
 
     # Create two columns for layout
     col1, col2 = st.columns([2, 1])
@@ -236,14 +341,16 @@ def main():
         )
 
         if uploaded_files:
-            new_files = [f for f in uploaded_files if f.name not in st.session_state.processed_files]
+            hashes = {f.name: file_content_hash(f) for f in uploaded_files}
+            new_files = [f for f in uploaded_files if hashes[f.name] not in st.session_state.processed_hashes]
             if new_files and st.button("Process Files", type="primary"):
                 with st.spinner("Processing files..."):
-                    results = asyncio.run(app.process_files(new_files))
-                    
+                    results = run_async(app.process_files(new_files))
+
                     for result in results:
                         if result["status"] == "success":
                             st.session_state.processed_files.add(result["filename"])
+                            st.session_state.processed_hashes.add(hashes.get(result["filename"]))
                             st.success(f"✅ {result['filename']} processed successfully")
                         else:
                             st.error(f"❌ Error processing {result['filename']}: {result['message']}")
@@ -258,52 +365,35 @@ def main():
         # Chat Section
         st.subheader("💬 Chat with Your Documents")
         
-        # Display chat history
+        # Display chat history via native chat containers, which Streamlit
+        # diff-renders instead of rebuilding every message's HTML per rerun
         for chat in st.session_state.chat_history:
-            # Question
-            st.markdown(f"""
-                <div class="chat-message user-message">
-                    <strong>You:</strong> {chat['question']}
-                </div>
-            """, unsafe_allow_html=True)
-            
-            # Answer
-            st.markdown(f"""
-                <div class="chat-message bot-message">
-                    <strong>Assistant:</strong><br>{chat['answer']}
-                </div>
-            """, unsafe_allow_html=True)
-            
-            # Sources
-            if chat['sources']:
-                with st.expander("View Sources"):
-                    for source in chat['sources']:
-                        st.markdown(f"""
-                        **{source['metadata'].get('filename')}**  
-                        Confidence: {source.get('score', 'N/A'):.2f}
-                        """)
-                        st.markdown("---")
-
-        # Chat input form
-        with st.form(key="chat_form", clear_on_submit=True):
-            query = st.text_input(
-                "",
-                placeholder="Ask anything about your documents...",
-                key="query_input"
-            )
-            submit_button = st.form_submit_button("Send", type="primary")
+            with st.chat_message("user"):
+                st.write(chat['question'])
+            with st.chat_message("assistant"):
+                st.write(chat['answer'])
+                if chat['sources']:
+                    with st.expander("View Sources"):
+                        source_parts = []
+                        for source in chat['sources']:
+                            source_parts.append(
+                                f"**{source['metadata'].get('filename')}**  \n"
+                                f"Confidence: {source.get('score', 'N/A'):.2f}"
+                            )
+                        st.markdown("\n\n---\n\n".join(source_parts))
 
-        if submit_button and query:
+        query = st.chat_input("Ask anything about your documents...")
+        if query:
             with st.spinner("Analyzing..."):
-                response, sources = asyncio.run(app.query_documents(query))
-                
+                response, sources = run_query(query)
+
                 # Add the new Q&A pair to chat history
                 st.session_state.chat_history.append({
                     "question": query,
                     "answer": response,
                     "sources": sources
                 })
-                
+
                 st.rerun()
         
         # Clear Chat History button
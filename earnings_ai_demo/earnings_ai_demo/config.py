@@ -0,0 +1,12 @@
+# earnings_ai_demo/earnings_ai_demo/config.py
+from functools import lru_cache
+import yaml
+
+CONFIG_PATH = 'config/config.yaml'
+
+
+@lru_cache(maxsize=1)
+def load_config() -> dict:
+    """Parse the YAML config once per process and reuse the result."""
+    with open(CONFIG_PATH) as f:
+        return yaml.safe_load(f)
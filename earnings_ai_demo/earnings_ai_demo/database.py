@@ -1,9 +1,12 @@
 # earnings_ai_demo/earnings_ai_demo/database.py
 import time
-from pymongo import MongoClient, ASCENDING
+from pymongo import MongoClient, ASCENDING, UpdateOne
 from pymongo.server_api import ServerApi
 from pymongo.operations import SearchIndexModel
-from typing import Dict, List, Union
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from bson.binary import Binary, BinaryVectorDtype
+from typing import Dict, List, Tuple, Union
+import numpy as np
 import logging
 
 class DatabaseOperations:
@@ -12,6 +15,9 @@ class DatabaseOperations:
        self.db = self.client.earnings_db
        self.documents = self.db.documents
        self.index_ready = False
+       self._ann_ids = []
+       self._ann_matrix = None
+       self._ann_scales = None
        self._setup_indexes()
 
    def _setup_indexes(self):
@@ -33,10 +39,30 @@ class DatabaseOperations:
                self.documents.create_search_index(model=search_index_model)
                self._wait_for_index_build()
 
+           # The pre-chunking layout enforced uniqueness on (filename, document_type)
+           # alone; chunk documents share both, so drop that index if it survives
+           legacy_index = "metadata.filename_1_metadata.document_type_1"
+           if legacy_index in self.documents.index_information():
+               self.documents.drop_index(legacy_index)
+
+           self.documents.create_index(
+               [("metadata.filename", ASCENDING),
+                ("metadata.document_type", ASCENDING),
+                ("metadata.chunk_idx", ASCENDING)],
+               unique=True,
+               background=True
+           )
+
+           # Cross-session dedup on content, independent of the uploaded filename;
+           # chunk_idx keeps sibling chunks of the same document from colliding.
+           # Scope the index to documents that actually carry a content_hash —
+           # a sparse compound index would still index hashless chunk documents
+           # under (null, chunk_idx) and make unrelated documents collide
            self.documents.create_index(
-               [("metadata.filename", ASCENDING), 
-                ("metadata.document_type", ASCENDING)],
+               [("metadata.content_hash", ASCENDING),
+                ("metadata.chunk_idx", ASCENDING)],
                unique=True,
+               partialFilterExpression={"metadata.content_hash": {"$exists": True}},
                background=True
            )
            
@@ -56,34 +82,185 @@ class DatabaseOperations:
            time.sleep(retry_interval)
        raise TimeoutError(f"Index build timed out after {timeout}s")
 
+   def _refresh_index_ready(self):
+       """Cheaply re-check whether the Atlas vector index became queryable."""
+       try:
+           indices = list(self.documents.list_search_indexes())
+           if indices and all(idx.get("queryable", False) for idx in indices):
+               self.index_ready = True
+               logging.info("Vector search index is ready")
+       except Exception as e:
+           logging.warning(f"Search index probe failed: {e}")
+
+   @staticmethod
+   def _encode_embeddings(embeddings: List[float]) -> Binary:
+       """Pack an embedding as a BinData float32 vector: 4 bytes/element vs ~9 for a BSON double array."""
+       return Binary.from_vector(np.asarray(embeddings, dtype=np.float32), BinaryVectorDtype.FLOAT32)
+
+   @staticmethod
+   def _decode_embeddings(stored) -> np.ndarray:
+       if isinstance(stored, Binary):
+           return np.asarray(stored.as_vector().data, dtype=np.float32)
+       # Legacy documents stored as a list of floats
+       return np.asarray(stored, dtype=np.float32)
+
+   @staticmethod
+   def quantize_int8(embedding: List[float]) -> Tuple[np.ndarray, float]:
+       """Scalar-quantize an embedding to int8 with a per-vector scale (4x smaller than FP32)."""
+       vec = np.asarray(embedding, dtype=np.float32)
+       scale = float(np.abs(vec).max()) / 127.0 if vec.size else 1.0
+       if scale == 0.0:
+           scale = 1.0
+       return np.round(vec / scale).astype(np.int8), scale
+
+   @staticmethod
+   def dequantize_int8(quantized: np.ndarray, scale: float) -> List[float]:
+       return (np.asarray(quantized, dtype=np.float32) * scale).tolist()
+
+   def _build_ann_index(self):
+       """Load stored embeddings into a normalized in-memory matrix for local search.
+
+       Rows are int8-quantized with per-vector scales: a quarter of the FP32
+       RAM with negligible recall loss for normalized cosine scoring."""
+       ids = []
+       rows = []
+       scales = []
+       for doc in self.documents.find({}, {"embeddings": 1}):
+           vec = self._decode_embeddings(doc["embeddings"])
+           norm = np.linalg.norm(vec)
+           if norm:
+               vec = vec / norm
+           quantized, scale = self.quantize_int8(vec)
+           ids.append(doc["_id"])
+           rows.append(quantized)
+           scales.append(scale)
+       self._ann_ids = ids
+       self._ann_matrix = np.stack(rows) if rows else None
+       self._ann_scales = np.asarray(scales, dtype=np.float32) if rows else None
+       logging.info(f"Built in-process ANN index over {len(ids)} embeddings")
+
+   def ann_search(self, query_embedding: List[float], limit: int = 5, filters: Dict = None) -> List[Dict]:
+       """Top-k cosine search over an in-memory copy of stored embeddings.
+
+       Used as a fallback while the Atlas vector search index is not queryable,
+       with Mongo only hydrating text/metadata for the winning ids."""
+       if self._ann_matrix is None:
+           self._build_ann_index()
+       if self._ann_matrix is None:
+           return []
+
+       query_vec = np.asarray(query_embedding, dtype=np.float32)
+       norm = np.linalg.norm(query_vec)
+       if norm:
+           query_vec = query_vec / norm
+
+       scores = (self._ann_matrix @ query_vec).astype(np.float32) * self._ann_scales
+       k = min(limit, len(scores))
+       top = np.argpartition(scores, -k)[-k:]
+       id_to_score = {self._ann_ids[i]: float(scores[i]) for i in top}
+
+       query = {"_id": {"$in": list(id_to_score)}}
+       if filters:
+           query.update(filters)
+
+       results = list(self.documents.find(query, {"text": 1, "metadata": 1}))
+       for doc in results:
+           doc["score"] = id_to_score[doc["_id"]]
+       results.sort(key=lambda doc: doc["score"], reverse=True)
+       return results
+
+   @staticmethod
+   def _is_content_hash_violation(error_details: Dict) -> bool:
+       """Check whether a duplicate-key error comes from the content-hash index.
+
+       Only those violations mean 'this content is already stored'; collisions
+       on the filename/document_type/chunk_idx index are real write failures."""
+       key_pattern = error_details.get("keyPattern")
+       if key_pattern:
+           return "metadata.content_hash" in key_pattern
+       return "metadata.content_hash" in error_details.get("errmsg", "")
+
    def store_document(self, text: str, embeddings: List[float], metadata: Dict[str, Union[str, int]]) -> str:
        try:
            doc = {
                "text": text,
-               "embeddings": embeddings,
+               "embeddings": self._encode_embeddings(embeddings),
                "metadata": metadata
            }
            result = self.documents.update_one(
                {
                    "metadata.filename": metadata["filename"],
-                   "metadata.document_type": metadata.get("document_type", "unknown")
+                   "metadata.document_type": metadata.get("document_type", "unknown"),
+                   "metadata.chunk_idx": metadata.get("chunk_idx", 0)
                },
                {"$set": doc},
                upsert=True
            )
+           self._ann_matrix = None
            doc_id = str(result.upserted_id or result.matched_count)
            logging.info(f"Stored document: {metadata['filename']}")
            return doc_id
-           
+
+       except DuplicateKeyError as e:
+           if self._is_content_hash_violation(e.details or {}):
+               logging.info(f"Duplicate content, skipping store: {metadata.get('filename')}")
+               return "duplicate"
+           logging.error(f"Store failed for {metadata.get('filename')}: {e}")
+           raise
        except Exception as e:
            logging.error(f"Store failed for {metadata.get('filename')}: {e}")
            raise
 
+   def store_documents(self, documents: List[Dict]) -> List[Dict]:
+       """Store many documents in one unordered bulk round-trip."""
+       operations = []
+       for doc in documents:
+           metadata = doc["metadata"]
+           operations.append(UpdateOne(
+               {
+                   "metadata.filename": metadata["filename"],
+                   "metadata.document_type": metadata.get("document_type", "unknown"),
+                   "metadata.chunk_idx": metadata.get("chunk_idx", 0)
+               },
+               {"$set": {
+                   "text": doc["text"],
+                   "embeddings": self._encode_embeddings(doc["embeddings"]),
+                   "metadata": metadata
+               }},
+               upsert=True
+           ))
+
+       statuses = [{"filename": doc["metadata"].get("filename"), "status": "success"} for doc in documents]
+       if not operations:
+           return statuses
+
+       try:
+           self.documents.bulk_write(operations, ordered=False)
+       except BulkWriteError as e:
+           for error in e.details.get("writeErrors", []):
+               filename = documents[error["index"]]["metadata"].get("filename")
+               if error.get("code") == 11000 and self._is_content_hash_violation(error):
+                   # Duplicate content already stored; treat as success
+                   logging.info(f"Duplicate content, skipping store: {filename}")
+                   continue
+               statuses[error["index"]] = {
+                   "filename": filename,
+                   "status": "error",
+                   "message": error.get("errmsg", "bulk write failed")
+               }
+
+       self._ann_matrix = None
+       stored = sum(1 for status in statuses if status["status"] == "success")
+       logging.info(f"Stored {stored}/{len(documents)} documents in bulk")
+       return statuses
+
    def query_similar(self, query_embedding: List[float], limit: int = 5, filters: Dict = None) -> List[Dict]:
        try:
            if not self.index_ready:
-               logging.warning("Vector index not ready yet")
-               self._wait_for_index_build()
+               self._refresh_index_ready()
+           if not self.index_ready:
+               logging.warning("Vector index not ready, using in-process ANN fallback")
+               return self.ann_search(query_embedding, limit=limit, filters=filters)
 
            doc_count = self.documents.count_documents({})
            if doc_count == 0:
@@ -1,7 +1,10 @@
-# earnings_ai_demo/earnings_ai_demo/embedding.py 
-from typing import List
+# earnings_ai_demo/earnings_ai_demo/embedding.py
+from typing import List, Tuple
+import asyncio
+import atexit
 import fireworks.client
 from fireworks.client import Fireworks
+import httpx
 import numpy as np
 from tenacity import retry, stop_after_attempt, wait_exponential
 
@@ -9,7 +12,28 @@ class EmbeddingGenerator:
     def __init__(self, api_key: str, model: str = "nomic-ai/nomic-embed-text-v1.5"):
         self.client = Fireworks(api_key=api_key)
         self.model = model
-        
+        self._api_key = api_key
+        self._async_client = None
+
+    def _get_async_client(self) -> httpx.AsyncClient:
+        """Lazily create one pooled async HTTP client shared by all async calls."""
+        if self._async_client is None:
+            self._async_client = httpx.AsyncClient(
+                base_url="https://api.fireworks.ai/inference/v1",
+                headers={"Authorization": f"Bearer {self._api_key}"},
+                timeout=60,
+                limits=httpx.Limits(max_connections=32, max_keepalive_connections=32)
+            )
+            atexit.register(self._close_async_client)
+        return self._async_client
+
+    def _close_async_client(self):
+        if self._async_client is not None and not self._async_client.is_closed:
+            try:
+                asyncio.run(self._async_client.aclose())
+            except RuntimeError:
+                pass
+
     @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10))
     def generate_embedding(self, text: str, prefix: str = "") -> List[float]:
         if prefix:
@@ -42,14 +66,72 @@ class EmbeddingGenerator:
             chunk = ' '.join(words[i:i + chunk_size])
             chunks.append(chunk)
         return chunks
+
+    def chunk_text(self, text: str, chunk_size: int = 1000, overlap: int = 100) -> List[str]:
+        """Split a document into overlapping word windows for chunk-level storage."""
+        return self._chunk_text(text, chunk_size, overlap)
         
-    def generate_document_embedding(self, text: str, prefix: str = "", method: str = "mean") -> List[float]:
-        chunks = self._chunk_text(text)
-        chunk_embeddings = self.generate_embeddings_batch(chunks, prefix)
-        
+    def _combine_chunk_embeddings(self, chunk_embeddings: List[List[float]], method: str) -> List[float]:
         if method == "mean":
             return np.mean(chunk_embeddings, axis=0).tolist()
         elif method == "max":
             return np.max(chunk_embeddings, axis=0).tolist()
         else:
-            raise ValueError(f"Unsupported combining method: {method}")
\ No newline at end of file
+            raise ValueError(f"Unsupported combining method: {method}")
+
+    def generate_document_embedding(self, text: str, prefix: str = "", method: str = "mean") -> List[float]:
+        chunks = self._chunk_text(text)
+        chunk_embeddings = self.generate_embeddings_batch(chunks, prefix)
+        return self._combine_chunk_embeddings(chunk_embeddings, method)
+
+    def _collect_chunks(self, texts: List[str]) -> Tuple[List[str], List[int]]:
+        all_chunks = []
+        chunk_counts = []
+        for text in texts:
+            chunks = self._chunk_text(text)
+            all_chunks.extend(chunks)
+            chunk_counts.append(len(chunks))
+        return all_chunks, chunk_counts
+
+    def _pool_per_document(self, chunk_embeddings: List[List[float]], chunk_counts: List[int], method: str) -> List[List[float]]:
+        embeddings = []
+        offset = 0
+        for count in chunk_counts:
+            embeddings.append(self._combine_chunk_embeddings(chunk_embeddings[offset:offset + count], method))
+            offset += count
+        return embeddings
+
+    def generate_document_embeddings(self, texts: List[str], prefix: str = "", method: str = "mean") -> List[List[float]]:
+        """Embed several documents with one batched API call instead of one per document."""
+        all_chunks, chunk_counts = self._collect_chunks(texts)
+        chunk_embeddings = self.generate_embeddings_batch(all_chunks, prefix)
+        return self._pool_per_document(chunk_embeddings, chunk_counts, method)
+
+    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10))
+    async def _apost_embeddings(self, inputs: List[str]) -> List[List[float]]:
+        response = await self._get_async_client().post(
+            "/embeddings",
+            json={"input": inputs, "model": self.model}
+        )
+        response.raise_for_status()
+        data = sorted(response.json()["data"], key=lambda item: item["index"])
+        return [item["embedding"] for item in data]
+
+    async def agenerate_embeddings_batch(self, texts: List[str], prefix: str = "", chunk_size: int = 1000) -> List[List[float]]:
+        if prefix:
+            texts = [prefix + text for text in texts]
+
+        embeddings = []
+        for i in range(0, len(texts), chunk_size):
+            embeddings.extend(await self._apost_embeddings(texts[i:i + chunk_size]))
+        return embeddings
+
+    async def agenerate_document_embedding(self, text: str, prefix: str = "", method: str = "mean") -> List[float]:
+        chunks = self._chunk_text(text)
+        chunk_embeddings = await self.agenerate_embeddings_batch(chunks, prefix)
+        return self._combine_chunk_embeddings(chunk_embeddings, method)
+
+    async def agenerate_document_embeddings(self, texts: List[str], prefix: str = "", method: str = "mean") -> List[List[float]]:
+        all_chunks, chunk_counts = self._collect_chunks(texts)
+        chunk_embeddings = await self.agenerate_embeddings_batch(all_chunks, prefix)
+        return self._pool_per_document(chunk_embeddings, chunk_counts, method)
\ No newline at end of file
@@ -2,8 +2,25 @@ import fitz  # PyMuPDF
 from docx import Document
 from pathlib import Path
 from typing import Dict, Optional
+import concurrent.futures
 import logging
 import json
+import os
+
+_process_pool = None
+
+
+def get_process_pool() -> concurrent.futures.ProcessPoolExecutor:
+    """Lazily create the process pool shared by CPU-bound extraction work."""
+    global _process_pool
+    if _process_pool is None:
+        _process_pool = concurrent.futures.ProcessPoolExecutor(max_workers=os.cpu_count())
+    return _process_pool
+
+
+def extract_text(file_path: str) -> Dict:
+    """Module-level entry point picklable for process-pool workers."""
+    return DocumentExtractor().extract_text(file_path)
 
 class DocumentExtractor:
     supported_extensions = {'.pdf', '.docx', '.txt'}
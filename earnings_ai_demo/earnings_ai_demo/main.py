@@ -1,6 +1,6 @@
 import asyncio
-import yaml
 from pathlib import Path
+from earnings_ai_demo.config import load_config
 from earnings_ai_demo.database import DatabaseOperations
 from earnings_ai_demo.transcription import AudioTranscriber
 from earnings_ai_demo.embedding import EmbeddingGenerator
@@ -11,8 +11,7 @@ import logging
 
 async def main():
     # Load config
-    with open('config/config.yaml') as f:
-        config = yaml.safe_load(f)
+    config = load_config()
 
     # Initialize components
     db = DatabaseOperations(config['mongodb']['uri'])
@@ -24,69 +23,71 @@ async def main():
         database_operations=db
     )
 
-    # Process audio files
-    audio_results = await transcriber.transcribe_directory(
-        'data/audio',
-        metadata={'company_ticker': 'MDB'}
+    # Transcribe audio and extract documents concurrently
+    audio_results, doc_results = await asyncio.gather(
+        transcriber.transcribe_directory(
+            'data/audio',
+            metadata={'company_ticker': 'MDB'}
+        ),
+        asyncio.to_thread(doc_extractor.process_directory, 'data/documents')
     )
 
-    # Process documents
-    doc_results = doc_extractor.process_directory('data/documents')
-
     # Debugging: Log the processed results
     logging.info("Audio Results:")
     logging.info(audio_results)
     logging.info("Document Results:")
     logging.info(doc_results)
 
-    # Process audio transcripts and create embeddings
-    for source, content in audio_results.items():
-        if 'error' in content:
-            continue
-            
+    async def ingest_batch(items, prefix, document_type):
+        """Chunk a list of (text, metadata) pairs, batch-embed the chunks and bulk-store them."""
+        if not items:
+            return
+        chunk_lists = [embedding_gen.chunk_text(text) for text, _ in items]
         try:
-            # Create embedding from transcription
-            embedding = embedding_gen.generate_document_embedding(
-                content['transcription'], 
-                prefix="audio_transcript: "
-            )
-            
-            # Store in MongoDB
-            db.store_document(
-                text=content['transcription'],
-                embeddings=embedding,
-                metadata={
-                    **content['metadata'],
-                    'document_type': 'audio_transcript',
-                    'company_ticker': 'MDB'
-                }
+            chunk_embeddings = await embedding_gen.agenerate_embeddings_batch(
+                [chunk for chunks in chunk_lists for chunk in chunks],
+                prefix
             )
-            logging.info(f"Stored audio transcript: {source}")
         except Exception as e:
-            logging.error(f"Failed to process audio {source}: {e}")
+            logging.error(f"Failed to embed {document_type} batch: {e}")
+            return
 
-    # Process documents (your existing document processing code)
-    for source, content in doc_results.items():
-        if 'error' in content or 'text' not in content:
-            continue
+        docs = []
+        offset = 0
+        for (text, metadata), chunks in zip(items, chunk_lists):
+            parent_id = metadata.get('filename')
+            for idx, (chunk, embedding) in enumerate(zip(chunks, chunk_embeddings[offset:offset + len(chunks)])):
+                docs.append({
+                    "text": chunk,
+                    "embeddings": embedding,
+                    "metadata": {
+                        **metadata,
+                        'document_type': document_type,
+                        'company_ticker': 'MDB',
+                        'parent_id': parent_id,
+                        'chunk_idx': idx
+                    }
+                })
+            offset += len(chunks)
+        for status in await asyncio.to_thread(db.store_documents, docs):
+            if status['status'] == 'success':
+                logging.info(f"Stored {document_type}: {status['filename']}")
+            else:
+                logging.error(f"Failed to store {document_type} {status['filename']}: {status['message']}")
 
-        try:
-            embedding = embedding_gen.generate_document_embedding(
-                content['text'],
-                prefix="document: "
-            )
-            db.store_document(
-                text=content['text'],
-                embeddings=embedding,
-                metadata={
-                    **content['metadata'],
-                    'document_type': 'document',
-                    'company_ticker': 'MDB'
-                }
-            )
-            logging.info(f"Stored document: {source}")
-        except Exception as e:
-            logging.error(f"Failed to process document {source}: {e}")
+    # Embed and store both batches concurrently
+    audio_items = [
+        (content['transcription'], content['metadata'])
+        for content in audio_results.values() if 'error' not in content
+    ]
+    doc_items = [
+        (content['text'], content['metadata'])
+        for content in doc_results.values() if 'error' not in content and 'text' in content
+    ]
+    await asyncio.gather(
+        ingest_batch(audio_items, "audio_transcript: ", "audio_transcript"),
+        ingest_batch(doc_items, "document: ", "document")
+    )
 
     # Test queries
     queries = [
@@ -1,8 +1,87 @@
 # earnings_ai_demo/earnings_ai_demo/query.py
 from fireworks.client import Fireworks
+from collections import OrderedDict
 from typing import List, Dict, Optional
+import numpy as np
+import threading
+import time
 import logging
 
+try:
+    from numba import njit, prange
+    _HAVE_NUMBA = True
+except ImportError:
+    _HAVE_NUMBA = False
+
+if _HAVE_NUMBA:
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _dot_scores(query, matrix, count):
+        scores = np.empty(count, dtype=np.float32)
+        for i in prange(count):
+            total = 0.0
+            for j in range(matrix.shape[1]):
+                total += query[j] * matrix[i, j]
+            scores[i] = total
+        return scores
+else:
+    def _dot_scores(query, matrix, count):
+        return matrix[:count] @ query
+
+
+class _SimilarityCache:
+    """LRU cache of answered queries, hit when a new query embedding is close enough.
+
+    Embeddings live in one preallocated contiguous float32 matrix so the
+    scoring kernel reads sequential memory; evicted entries' rows are reused.
+    A lock guards the bookkeeping since Streamlit sessions share one cache
+    across threads."""
+
+    def __init__(self, max_entries: int = 256, threshold: float = 0.95):
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self._entries = OrderedDict()
+        self._matrix = None
+        self._used_rows = 0
+        self._next_label = 0
+        self._lock = threading.Lock()
+
+    def _normalize(self, embedding: List[float]) -> np.ndarray:
+        vec = np.ascontiguousarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm else vec
+
+    def get(self, embedding: List[float], key) -> Optional[Dict]:
+        with self._lock:
+            candidates = [(label, entry) for label, entry in self._entries.items() if entry["key"] == key]
+            if not candidates:
+                return None
+            scores = _dot_scores(self._normalize(embedding), self._matrix, self._used_rows)
+            label, best = max(((label, scores[entry["row"]]) for label, entry in candidates),
+                              key=lambda pair: pair[1])
+            if best < self.threshold:
+                return None
+            self._entries.move_to_end(label)
+            return self._entries[label]["result"]
+
+    def add(self, embedding: List[float], key, result: Dict):
+        vec = self._normalize(embedding)
+        with self._lock:
+            if self._matrix is None:
+                self._matrix = np.zeros((self.max_entries, vec.size), dtype=np.float32)
+
+            if len(self._entries) >= self.max_entries:
+                _, evicted = self._entries.popitem(last=False)
+                row = evicted["row"]
+            else:
+                row = self._used_rows
+                self._used_rows += 1
+
+            self._matrix[row] = vec
+            label = self._next_label
+            self._next_label += 1
+            self._entries[label] = {"key": key, "result": result, "row": row}
+
+
 class QueryInterface:
     def __init__(self, 
                  api_key: str,
@@ -13,6 +92,7 @@ class QueryInterface:
         self.model = model
         self.embedding_model = embedding_model
         self.db = database_operations
+        self._similarity_cache = _SimilarityCache()
 
     def query(self, query: str, company_ticker: Optional[str] = None, doc_type: Optional[str] = None, num_results: int = 5) -> Dict:
         try:
@@ -21,6 +101,12 @@ class QueryInterface:
                 model=self.embedding_model
             ).data[0].embedding
 
+            cache_key = (company_ticker, doc_type, num_results)
+            cached = self._similarity_cache.get(query_embedding, cache_key)
+            if cached is not None:
+                logging.info(f"Similarity cache hit for query: {query}")
+                return cached
+
             filters = {}
             if company_ticker:
                 filters["metadata.company_ticker"] = company_ticker
@@ -53,10 +139,12 @@ class QueryInterface:
                 ]
             )
 
-            return {
+            result = {
                 "response": response.choices[0].message.content,
                 "sources": relevant_docs
             }
+            self._similarity_cache.add(query_embedding, cache_key, result)
+            return result
 
         except Exception as e:
             logging.error(f"Query failed: {e}")
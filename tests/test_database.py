@@ -1,5 +1,7 @@
 import pytest
+import numpy as np
 from unittest.mock import MagicMock
+from pymongo.errors import BulkWriteError
 from earnings_ai_demo.database import DatabaseOperations
 
 @pytest.fixture
@@ -43,6 +45,48 @@ def test_delete_document(db_ops):
     db_ops.documents.delete_one = MagicMock(return_value=MagicMock(deleted_count=1))
     
     deleted = db_ops.delete_document('doc_id')
-    
+
     assert deleted == True
-    db_ops.documents.delete_one.assert_called_once_with({'_id': 'doc_id'})
\ No newline at end of file
+    db_ops.documents.delete_one.assert_called_once_with({'_id': 'doc_id'})
+
+def test_store_documents_empty_batch(db_ops):
+    db_ops.documents.bulk_write = MagicMock()
+
+    statuses = db_ops.store_documents([])
+
+    assert statuses == []
+    db_ops.documents.bulk_write.assert_not_called()
+
+def test_store_documents_maps_write_errors(db_ops):
+    docs = [
+        {'text': f'doc{i}', 'embeddings': [0.1, 0.2], 'metadata': {'filename': f'doc{i}.txt'}}
+        for i in range(4)
+    ]
+    db_ops.documents.bulk_write = MagicMock(side_effect=BulkWriteError({
+        'writeErrors': [
+            {'index': 1, 'code': 121, 'errmsg': 'validation failed'},
+            {'index': 2, 'code': 11000, 'errmsg': 'duplicate key',
+             'keyPattern': {'metadata.content_hash': 1, 'metadata.chunk_idx': 1}},
+            {'index': 3, 'code': 11000, 'errmsg': 'duplicate key',
+             'keyPattern': {'metadata.filename': 1, 'metadata.document_type': 1, 'metadata.chunk_idx': 1}}
+        ]
+    }))
+
+    statuses = db_ops.store_documents(docs)
+
+    assert statuses[0] == {'filename': 'doc0.txt', 'status': 'success'}
+    assert statuses[1]['status'] == 'error'
+    assert statuses[1]['message'] == 'validation failed'
+    # Content-hash violations mean the content is already stored
+    assert statuses[2] == {'filename': 'doc2.txt', 'status': 'success'}
+    # Collisions on the filename index are real write failures
+    assert statuses[3]['status'] == 'error'
+
+def test_quantize_int8_roundtrip():
+    vec = list(np.linspace(-1.0, 1.0, 768))
+
+    quantized, scale = DatabaseOperations.quantize_int8(vec)
+    restored = DatabaseOperations.dequantize_int8(quantized, scale)
+
+    assert quantized.dtype == np.int8
+    assert np.allclose(restored, vec, atol=scale)
\ No newline at end of file
@@ -41,4 +41,4 @@ def test_prefix_handling(embedding_generator):
     text = "test document"
     embedding1 = embedding_generator.generate_embedding(text)
     embedding2 = embedding_generator.generate_embedding(text, prefix="query: ")
-    assert not np.array_equal(embedding1, embedding2)
\ No newline at end of file
+    assert not np.array_equal(embedding1, embedding2)
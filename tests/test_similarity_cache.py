@@ -0,0 +1,57 @@
+# tests/test_similarity_cache.py
+import numpy as np
+from earnings_ai_demo.query import _SimilarityCache
+
+KEY = ('MDB', None, 5)
+
+def test_hit_above_threshold():
+    cache = _SimilarityCache()
+    cache.add([1.0, 0.0, 0.0, 0.0], KEY, {'response': 'answer'})
+
+    # cosine ~0.995 against the cached vector
+    assert cache.get([0.99, 0.1, 0.0, 0.0], KEY) == {'response': 'answer'}
+
+def test_miss_below_threshold():
+    cache = _SimilarityCache()
+    cache.add([1.0, 0.0, 0.0, 0.0], KEY, {'response': 'answer'})
+
+    # cosine ~0.707, below the 0.95 threshold
+    assert cache.get([1.0, 1.0, 0.0, 0.0], KEY) is None
+
+def test_key_partitioning():
+    cache = _SimilarityCache()
+    cache.add([1.0, 0.0, 0.0, 0.0], KEY, {'response': 'answer'})
+
+    assert cache.get([1.0, 0.0, 0.0, 0.0], ('MDB', 'earnings_call', 5)) is None
+    assert cache.get([1.0, 0.0, 0.0, 0.0], KEY) == {'response': 'answer'}
+
+def test_lru_eviction_reuses_rows():
+    cache = _SimilarityCache(max_entries=2)
+    e1 = [1.0, 0.0, 0.0, 0.0]
+    e2 = [0.0, 1.0, 0.0, 0.0]
+    e3 = [0.0, 0.0, 1.0, 0.0]
+    e4 = [0.0, 0.0, 0.0, 1.0]
+
+    cache.add(e1, KEY, {'r': 1})
+    cache.add(e2, KEY, {'r': 2})
+    cache.add(e3, KEY, {'r': 3})
+
+    # e1 was least recently used: evicted, its matrix row recycled for e3
+    assert cache._used_rows == 2
+    assert cache.get(e1, KEY) is None
+    assert cache.get(e2, KEY) == {'r': 2}
+    assert cache.get(e3, KEY) == {'r': 3}
+
+    # touch e2 so e3 becomes the LRU entry
+    cache.get(e2, KEY)
+    cache.add(e4, KEY, {'r': 4})
+    assert cache.get(e3, KEY) is None
+    assert cache.get(e2, KEY) == {'r': 2}
+    assert cache.get(e4, KEY) == {'r': 4}
+
+def test_embeddings_are_normalized():
+    cache = _SimilarityCache()
+    cache.add([2.0, 0.0, 0.0, 0.0], KEY, {'response': 'answer'})
+
+    assert np.isclose(np.linalg.norm(cache._matrix[0]), 1.0)
+    assert cache.get([0.5, 0.0, 0.0, 0.0], KEY) == {'response': 'answer'}